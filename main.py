@@ -1,57 +1,100 @@
-import pandas as pd
-from datetime import timezone
-from pymongo import MongoClient
-from config import MONGODB_URI, MONGODB_DATABASE, MYSQL_CONFIG
-from modules.flattener import flatten_dataframe
-from modules.mysql_loader import create_database, load_dataframe, mark_deleted_documents, get_max_updated_at
-
-
-def main():
-    client = MongoClient(MONGODB_URI)
-    db = client[MONGODB_DATABASE]
-    collections = db.list_collection_names()
-
-    create_database(MYSQL_CONFIG)
-
-    for collection_name in collections:
-        print(f"\n[{collection_name}]")
-        collection = db[collection_name]
-        last_sync_time = get_max_updated_at(collection_name, MYSQL_CONFIG)
-        if last_sync_time is not None:
-            mongo_query = {'updated_at': {'$gt': last_sync_time}}
-            documents = list(collection.find(mongo_query))
-            print(f"  Querying MongoDB with updated_at > {last_sync_time} → {len(documents)} doc(s)")
-        else:
-            documents = list(collection.find({}))
-            print(f"  First run — fetching all {len(documents)} doc(s)")
-
-        if not documents:
-            print(f"  No new/updated documents — skipping.")
-            continue
-
-        df = pd.json_normalize(documents)
-
-        if df.empty:
-            continue
-
-        df_flattened = flatten_dataframe(df)
-        load_dataframe(collection_name, df_flattened, MYSQL_CONFIG)
-
-    print("\n--- Deletion Check ---")
-
-    for collection_name in collections:
-        collection = db[collection_name]
-        all_mongo_ids = [doc['_id'] for doc in collection.find({}, {'_id': 1})]
-
-        if not all_mongo_ids:
-            print(f"  [{collection_name}] Empty in MongoDB — skipping.")
-            continue
-
-        mark_deleted_documents(collection_name, all_mongo_ids, MYSQL_CONFIG)
-
-    client.close()
-    print(f"\nDone.")
-
-
-if __name__ == "__main__":
-    main()
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from pymongo import MongoClient
+from config import MONGODB_URI, MONGODB_DATABASE, MYSQL_CONFIG
+from modules.flattener import flatten_documents
+from modules.mysql_loader import create_database, load_dataframe, mark_deleted_documents, get_max_updated_at
+
+READ_BATCH_SIZE = 10000
+ID_SCAN_BATCH_SIZE = 50000
+MAX_WORKERS = 8
+
+
+def main():
+    client = MongoClient(MONGODB_URI)
+    collections = client[MONGODB_DATABASE].list_collection_names()
+    client.close()
+
+    create_database(MYSQL_CONFIG)
+
+    # Collections are independent (each writes its own MySQL table), so sync
+    # them concurrently; every worker opens its own Mongo connection and the
+    # loader opens its own MySQL connection per call.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(sync_collection, collections))
+
+    print("\n--- Deletion Check ---")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(check_deletions, collections))
+
+    print(f"\nDone.")
+
+
+def sync_collection(collection_name):
+    client = MongoClient(MONGODB_URI)
+    try:
+        collection = client[MONGODB_DATABASE][collection_name]
+        print(f"\n[{collection_name}]")
+        last_sync_time = get_max_updated_at(collection_name, MYSQL_CONFIG)
+        if last_sync_time is not None:
+            mongo_query = {'updated_at': {'$gt': last_sync_time}}
+            print(f"  [{collection_name}] Querying MongoDB with updated_at > {last_sync_time}")
+        else:
+            mongo_query = {}
+            print(f"  [{collection_name}] First run — fetching all documents")
+
+        # Stream the cursor in fixed-size chunks so the collection never has
+        # to fit in memory all at once.
+        cursor = collection.find(mongo_query, no_cursor_timeout=True).batch_size(READ_BATCH_SIZE)
+        total = 0
+        try:
+            chunk = []
+            for doc in cursor:
+                chunk.append(doc)
+                if len(chunk) >= READ_BATCH_SIZE:
+                    total += _load_chunk(collection_name, chunk)
+                    chunk = []
+            if chunk:
+                total += _load_chunk(collection_name, chunk)
+        finally:
+            cursor.close()
+
+        if total == 0:
+            print(f"  [{collection_name}] No new/updated documents — skipping.")
+        else:
+            print(f"  [{collection_name}] {total} doc(s) synced.")
+    finally:
+        client.close()
+
+
+def check_deletions(collection_name):
+    client = MongoClient(MONGODB_URI)
+    try:
+        collection = client[MONGODB_DATABASE][collection_name]
+        mongo_ids = {
+            str(doc['_id'])
+            for doc in collection.find({}, {'_id': 1}).batch_size(ID_SCAN_BATCH_SIZE)
+        }
+
+        if not mongo_ids:
+            print(f"  [{collection_name}] Empty in MongoDB — skipping.")
+            return
+
+        mark_deleted_documents(collection_name, mongo_ids, MYSQL_CONFIG)
+    finally:
+        client.close()
+
+
+def _load_chunk(collection_name, documents):
+    """Flatten and load one chunk of documents; returns the number of docs loaded."""
+    df = flatten_documents(documents)
+    if df.empty:
+        return 0
+
+    load_dataframe(collection_name, df, MYSQL_CONFIG)
+    return len(documents)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,53 @@
-import pandas as pd
-
-def flatten_dataframe(df):
-
-    df = df.copy()
-    changed = True
-
-    while changed:
-        changed = False
-
-        dict_cols = [col for col in df.columns if df[col].apply(lambda x: isinstance(x, dict)).any()]
-
-        for col in dict_cols:
-            col_data = df[col].apply(lambda x: x if isinstance(x, dict) else {})
-            normalized = pd.json_normalize(col_data)
-            normalized.columns = [f"{col}_{c}" for c in normalized.columns]
-            normalized.index = df.index
-
-            df = df.drop(columns=[col])
-            df = pd.concat([df, normalized], axis=1)
-            changed = True
-
-        list_cols = [col for col in df.columns if df[col].apply(lambda x: isinstance(x, list) and len(x) > 0).any()]
-
-        if list_cols:
-            for col in list_cols:
-                df[col] = df[col].apply(lambda x: x if isinstance(x, list) else [x])
-
-            for col in list_cols:
-                df = df.explode(col, ignore_index=True)
-
-            changed = True
-
-    return df
+import itertools
+
+import pandas as pd
+
+
+def flatten_documents(documents):
+    """
+    Flatten raw MongoDB documents into a DataFrame in a single pass.
+
+    Nested dicts are collapsed with `parent_key + '_' + child_key`; list
+    values are expanded into one row per element (cartesian product across
+    sibling lists, matching the old explode behaviour). Walking plain dicts
+    avoids the pd.json_normalize round-trips entirely.
+    """
+    records = []
+    for doc in documents:
+        flat = {}
+        _flatten_into(doc, "", flat)
+        _expand_lists(flat, records)
+    return pd.DataFrame(records)
+
+
+def _flatten_into(d, prefix, out):
+    """Recursively flatten a dict into `out`, joining keys with '_'."""
+    for key, value in d.items():
+        new_key = f"{prefix}_{key}" if prefix else key
+        if isinstance(value, dict):
+            if value:
+                _flatten_into(value, new_key, out)
+        else:
+            out[new_key] = value
+
+
+def _expand_lists(flat, records):
+    """Expand list values into one record per element (cartesian product)."""
+    list_keys = [k for k, v in flat.items() if isinstance(v, list)]
+    if not list_keys:
+        records.append(flat)
+        return
+
+    # Empty lists behave like explode: they yield a single null cell.
+    pools = [flat[k] if flat[k] else [None] for k in list_keys]
+    for combo in itertools.product(*pools):
+        record = dict(flat)
+        for key, element in zip(list_keys, combo):
+            if isinstance(element, dict):
+                del record[key]
+                if element:
+                    _flatten_into(element, key, record)
+            else:
+                record[key] = element
+        # Dict elements may have introduced new nested lists.
+        _expand_lists(record, records)
@@ -1,10 +1,17 @@
+import hashlib
+import os
+import tempfile
+
 import pymysql
 import pandas as pd
-from datetime import timezone
+from datetime import timedelta, timezone
 from modules.type_converter import get_column_types, prepare_dataframe_for_mysql
 
+_SANITIZE_TABLE = str.maketrans({".": "_", " ": "_", "-": "_", "$": None})
+
+
 def sanitize_column_name(col):
-    return col.replace(".", "_").replace(" ", "_").replace("-", "_").replace("$", "")
+    return col.translate(_SANITIZE_TABLE)
 
 
 def create_database(mysql_config):
@@ -51,15 +58,60 @@ def _prepare_df(df):
     return df, sanitized_cols, column_types
 
 
+# Known column → type map per table, so repeat loads whose columns all fit
+# the known schema skip the SHOW TABLES / DESCRIBE round-trips. Only this
+# process writes DDL, and DDL is an implicit commit in MySQL, so the cache
+# cannot go stale on rollback. Invalidated implicitly by being updated on
+# every DDL we issue.
+_SCHEMA_CACHE = {}
+
+
+def _widened_type(existing, inferred):
+    """
+    Return the type to MODIFY a column to when data inferred from a later
+    chunk no longer fits the existing column, else None. Types only ever
+    widen — never shrink — so a short chunk cannot truncate columns sized by
+    an earlier one.
+    """
+    existing = existing.upper()
+    inferred = inferred.upper()
+    if existing == inferred:
+        return None
+
+    if existing.startswith("VARCHAR("):
+        if inferred == "TEXT":
+            return "TEXT"
+        if inferred.startswith("VARCHAR(") and int(inferred[8:-1]) > int(existing[8:-1]):
+            return inferred
+        return None
+
+    if existing == "TINYINT(1)" and inferred in ("BIGINT", "DECIMAL(20,6)"):
+        return inferred
+
+    if existing == "BIGINT" and inferred == "DECIMAL(20,6)":
+        return inferred
+
+    # Numeric/datetime column that later chunks feed strings — fall back to
+    # TEXT rather than fail the load under strict sql_mode.
+    if existing in ("TINYINT(1)", "BIGINT", "DECIMAL(20,6)", "DATETIME") and (
+        inferred == "TEXT" or inferred.startswith("VARCHAR(")
+    ):
+        return "TEXT"
+
+    return None
+
+
 def _ensure_table(cur, table_name, sanitized_cols, column_types):
     """CREATE TABLE on first run. Includes id PK, all data columns, is_deleted, and _id index."""
     col_definitions = ", ".join([f"`{col}` {column_types[col]}" for col in sanitized_cols])
 
     if "_id" in sanitized_cols:
+        fp_expr = _fp_sql_expr(_fp_source_cols(sanitized_cols))
         create_sql = (
             f"CREATE TABLE `{table_name}` "
             f"(id INT PRIMARY KEY, {col_definitions}, is_deleted TINYINT(1) DEFAULT 0, "
-            f"INDEX `idx_id` (`_id`))"
+            f"`fp` BINARY(16) GENERATED ALWAYS AS ({fp_expr}) STORED, "
+            f"INDEX `idx_id` (`_id`), INDEX `idx_fp` (`fp`))"
         )
     else:
         create_sql = (
@@ -68,28 +120,91 @@ def _ensure_table(cur, table_name, sanitized_cols, column_types):
         )
 
     cur.execute(create_sql)
+    known = dict(column_types)
+    known["id"] = "INT"
+    known["is_deleted"] = "TINYINT(1)"
+    if "_id" in sanitized_cols:
+        known["fp"] = "BINARY(16)"
+    _SCHEMA_CACHE[table_name] = known
     print(f"  Table created.")
 
 
 def _evolve_schema(cur, table_name, sanitized_cols, column_types):
     """
     Schema evolution for incremental loads:
+    - MODIFY columns whose inferred type outgrew the existing one.
     - ADD COLUMN for any new fields that appeared in MongoDB.
     - Ensure is_deleted column exists.
     - Drop stale unique_id index if present.
     """
     cur.execute(f"DESCRIBE `{table_name}`")
-    existing_columns = {row[0] for row in cur.fetchall()}
-
+    existing_types = {row[0]: row[1] for row in cur.fetchall()}
+
+    # Widen columns that data from this chunk has outgrown (e.g. the first
+    # chunk fixed a VARCHAR length a later chunk exceeds). The fingerprint
+    # column references the data columns, so it must be dropped before any
+    # MODIFY and is re-added below.
+    to_widen = [
+        (col, wider)
+        for col in sanitized_cols
+        if col in existing_types
+        and (wider := _widened_type(existing_types[col], column_types[col]))
+    ]
+    if to_widen and "fp" in existing_types:
+        cur.execute(f"ALTER TABLE `{table_name}` DROP COLUMN `fp`")
+        del existing_types["fp"]
+    for col, wider in to_widen:
+        cur.execute(f"ALTER TABLE `{table_name}` MODIFY COLUMN `{col}` {wider}")
+        existing_types[col] = wider
+        print(f"  ~ Column widened: {col} → {wider}")
+
+    data_cols_added = False
     for col in sanitized_cols:
-        if col not in existing_columns:
+        if col not in existing_types:
             cur.execute(f"ALTER TABLE `{table_name}` ADD COLUMN `{col}` {column_types[col]}")
+            existing_types[col] = column_types[col]
+            data_cols_added = True
             print(f"  + Column added: {col}")
 
-    if "is_deleted" not in existing_columns:
+    if "is_deleted" not in existing_types:
         cur.execute(f"ALTER TABLE `{table_name}` ADD COLUMN `is_deleted` TINYINT(1) DEFAULT 0")
+        existing_types["is_deleted"] = "TINYINT(1)"
         print(f"  + Column added: is_deleted")
 
+    # Keep the stored fingerprint column in step with the data columns. The
+    # expression of a stored generated column cannot be altered in place, so
+    # it is dropped and re-added (MySQL backfills it during the rebuild).
+    if "_id" in existing_types:
+        fp_expr = _fp_sql_expr(_fp_source_cols(existing_types))
+        if "fp" not in existing_types:
+            cur.execute(
+                f"ALTER TABLE `{table_name}` "
+                f"ADD COLUMN `fp` BINARY(16) GENERATED ALWAYS AS ({fp_expr}) STORED, "
+                f"ADD INDEX `idx_fp` (`fp`)"
+            )
+            existing_types["fp"] = "BINARY(16)"
+            print(f"  + Column added: fp")
+        elif data_cols_added:
+            cur.execute(f"ALTER TABLE `{table_name}` DROP COLUMN `fp`")
+            cur.execute(
+                f"ALTER TABLE `{table_name}` "
+                f"ADD COLUMN `fp` BINARY(16) GENERATED ALWAYS AS ({fp_expr}) STORED, "
+                f"ADD INDEX `idx_fp` (`fp`)"
+            )
+            print(f"  ~ Fingerprint column rebuilt")
+
+    _SCHEMA_CACHE[table_name] = existing_types
+
+    # Restore idx_id if a crashed bulk load dropped it and never rebuilt it.
+    if "_id" in existing_types:
+        try:
+            cur.execute(f"SHOW INDEX FROM `{table_name}` WHERE Key_name = 'idx_id'")
+            if not cur.fetchone():
+                cur.execute(f"CREATE INDEX `idx_id` ON `{table_name}` (`_id`)")
+                print(f"  + Restored index: idx_id")
+        except Exception:
+            pass
+
     try:
         cur.execute(f"SHOW INDEX FROM `{table_name}` WHERE Key_name = 'unique_id'")
         if cur.fetchone():
@@ -99,17 +214,92 @@ def _evolve_schema(cur, table_name, sanitized_cols, column_types):
         pass
 
 
-def _row_fingerprint(row_dict, fp_cols):
-    """Deterministic fingerprint of a row, excluding id / is_deleted / updated_at."""
-    return "||".join(str(row_dict.get(c)) for c in fp_cols)
+FP_EXCLUDE = ("id", "is_deleted", "updated_at", "fp")
 
 
-def _upsert_by_id(cur, table_name, df, sanitized_cols):
+def _fp_source_cols(columns):
+    """Columns covered by the fingerprint, in deterministic (sorted) order."""
+    return sorted(c for c in columns if c not in FP_EXCLUDE)
+
+
+# NULL placeholder inside the fingerprint. CONCAT_WS silently skips NULLs,
+# which would make ({a: "x"}) and ({b: "x"}) hash identically and let a field
+# rename pass as an exact match — every column must contribute a token.
+FP_NULL_SENTINEL = "\x00"
+
+
+def _fp_sql_expr(fp_source_cols):
+    """SQL expression for the stored `fp` generated column."""
+    col_list = ", ".join(f"IFNULL(`{c}`, CHAR(0))" for c in fp_source_cols)
+    return f"UNHEX(MD5(CONCAT_WS('||', {col_list})))"
+
+
+def _row_fingerprint(values, mysql_types):
+    """
+    16-byte MD5 fingerprint of a row, matching the `fp` generated column.
+
+    Every column contributes a token: NULLs map to the same sentinel the SQL
+    expression substitutes via IFNULL, so values shifting between columns
+    always change the hash. Values are rendered the way MySQL stringifies
+    the column type (bools as TINYINT(1) 1/0, BIGINT floats without the
+    trailing .0, DECIMAL(20,6) padded to six places, DATETIME rounded to
+    whole seconds); a formatting mismatch makes the row look changed and
+    costs a redundant slot-reuse UPDATE.
+    """
+    parts = []
+    for v, mysql_type in zip(values, mysql_types):
+        if v is None:
+            parts.append(FP_NULL_SENTINEL)
+        elif mysql_type == "TINYINT(1)":
+            parts.append("1" if v else "0")
+        elif mysql_type == "DECIMAL(20,6)":
+            parts.append(f"{float(v):.6f}")
+        elif mysql_type == "BIGINT" and isinstance(v, float):
+            parts.append(str(int(v)))
+        elif mysql_type == "DATETIME" and hasattr(v, "strftime"):
+            # bson datetimes carry milliseconds; DATETIME stores whole
+            # seconds, rounding halves up like MySQL does on insert.
+            if getattr(v, "microsecond", 0) >= 500000:
+                v = v + timedelta(seconds=1)
+            parts.append(v.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            parts.append(str(v))
+    return hashlib.md5("||".join(parts).encode()).digest()
+
+
+SELECT_CHUNK_SIZE = 1000
+BULK_INDEX_THRESHOLD = 50000
+
+
+def _fetch_existing_rows(cur, table_name, uids):
+    """
+    Fetch (id, _id, fp) for all active rows with the given _ids in chunked
+    `WHERE _id IN (...)` queries and bucket them by _id. Only the stored
+    fingerprint travels over the wire, never the full row, and it costs one
+    round-trip per SELECT_CHUNK_SIZE ids instead of one per id.
+    """
+    existing_by_uid = {}
+    for i in range(0, len(uids), SELECT_CHUNK_SIZE):
+        chunk = uids[i:i + SELECT_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cur.execute(
+            f"SELECT id, `_id`, `fp` FROM `{table_name}` "
+            f"WHERE `_id` IN ({placeholders}) AND `is_deleted` = 0 ORDER BY `_id`, id",
+            list(chunk),
+        )
+        for erow in cur.fetchall():
+            existing_by_uid.setdefault(erow[1], []).append(erow)
+    return existing_by_uid
+
+
+def _upsert_by_id(cur, table_name, df, sanitized_cols, column_types):
     """
     Per-_id upsert strategy:
 
     For each unique _id in the incoming DataFrame:
-      1. Fetch all currently active MySQL rows for that _id.
+      1. Fetch (id, _id, fp) of all currently active MySQL rows for that _id —
+         the fingerprint is a stored generated column, so existing rows are
+         never hashed client-side.
       2. Build a fingerprint map (content hash → list of row ids).
       3. For each incoming row:
            - If fingerprint matches an existing active row → keep it (undelete if needed).
@@ -121,94 +311,197 @@ def _upsert_by_id(cur, table_name, df, sanitized_cols):
       - Previously deleted rows with the same content are revived (is_deleted = 0).
       - Rows removed from MongoDB are soft-deleted, never hard-deleted from MySQL.
     """
-    fp_exclude = {"id", "is_deleted", "updated_at"}
-    fp_cols = [c for c in sanitized_cols if c not in fp_exclude]
-    col_select = ", ".join([f"`{c}`" for c in sanitized_cols])
+    # Fingerprints cover the table's full data-column set (sorted, matching
+    # the generated-column expression); columns absent from this chunk are
+    # NULL for the incoming rows and hash as the NULL sentinel, same as the
+    # SQL side. Formatting follows the authoritative table types from the
+    # schema cache, not the chunk-inferred ones — a DECIMAL column whose
+    # chunk values happen to be integral must still hash as DECIMAL.
+    table_types = _SCHEMA_CACHE.get(table_name, column_types)
+    fp_cols = _fp_source_cols(table_types)
+    fp_idx = [sanitized_cols.index(c) if c in sanitized_cols else None for c in fp_cols]
+    fp_types = [(table_types.get(c) or column_types.get(c, "")).upper() for c in fp_cols]
+    updated_at_idx = sanitized_cols.index("updated_at") if "updated_at" in sanitized_cols else None
+
+    # Writes are classified into batches and flushed once at the end, so the
+    # per-uid loop below issues no UPDATE/INSERT round-trips of its own.
+    undelete_batch = []     # matched rows to revive: (updated_at?, mysql_id)
+    slot_reuse_batch = []   # full-row UPDATEs: [mysql_id] + row_data
+    insert_batch = []       # brand-new rows: [mysql_id] + row_data
+    soft_delete_ids = []    # leftover MySQL ids to mark deleted
+
+    # Fetch MAX(id) once and assign new ids from a local counter — no
+    # round-trip per insert.
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{table_name}`")
+    next_id = cur.fetchone()[0]
 
-    for uid in df["_id"].unique():
-        # Fetch all active rows for this _id from MySQL
-        cur.execute(
-            f"SELECT id, {col_select} FROM `{table_name}` "
-            f"WHERE `_id` = %s AND `is_deleted` = 0 ORDER BY id",
-            (uid,),
-        )
-        existing_rows = cur.fetchall()
-        col_names_with_id = ["id"] + sanitized_cols
+    unique_uids = df["_id"].unique()
+
+    # One chunked batch fetch for all incoming _ids instead of a SELECT per _id
+    existing_by_uid = _fetch_existing_rows(cur, table_name, unique_uids)
 
-        # Map fingerprint → list of MySQL row ids (FIFO)
+    # Single groupby pass instead of re-masking the whole frame per uid
+    for uid, sub_df in df.groupby("_id", sort=False):
+        existing_rows = existing_by_uid.get(uid, [])
+
+        # Map stored fingerprint → list of MySQL row ids (FIFO)
         existing_fp_map = {}
         for erow in existing_rows:
-            erow_dict = dict(zip(col_names_with_id, erow))
-            fp = _row_fingerprint(erow_dict, fp_cols)
-            existing_fp_map.setdefault(fp, []).append(erow_dict["id"])
+            existing_fp_map.setdefault(bytes(erow[2]), []).append(erow[0])
 
         matched_mysql_ids = set()
         rows_needing_slot = []
 
-        for _, row in df[df["_id"] == uid].iterrows():
-            row_data = row.values.tolist()
-            row_dict = dict(zip(sanitized_cols, row_data))
-            fp = _row_fingerprint(row_dict, fp_cols)
+        for row_tuple in sub_df.itertuples(index=False, name=None):
+            fp = _row_fingerprint(
+                (row_tuple[i] if i is not None else None for i in fp_idx), fp_types
+            )
 
             if fp in existing_fp_map and existing_fp_map[fp]:
                 # Exact match — row already exists; ensure it is active
                 mysql_id = existing_fp_map[fp].pop(0)
                 matched_mysql_ids.add(mysql_id)
-                if "updated_at" in sanitized_cols:
-                    cur.execute(
-                        f"UPDATE `{table_name}` SET `is_deleted` = 0, `updated_at` = %s WHERE id = %s",
-                        (row_dict.get("updated_at"), mysql_id),
-                    )
+                if updated_at_idx is not None:
+                    undelete_batch.append((row_tuple[updated_at_idx], mysql_id))
                 else:
-                    cur.execute(
-                        f"UPDATE `{table_name}` SET `is_deleted` = 0 WHERE id = %s",
-                        (mysql_id,),
-                    )
+                    undelete_batch.append((mysql_id,))
             else:
                 # No match — needs a slot (spare or new)
-                rows_needing_slot.append((row_data, row_dict))
+                rows_needing_slot.append(list(row_tuple))
 
         # IDs that were active but not matched by any incoming row
         spare_ids = [erow[0] for erow in existing_rows if erow[0] not in matched_mysql_ids]
 
-        for row_data, row_dict in rows_needing_slot:
+        for row_data in rows_needing_slot:
             if spare_ids:
                 # Reuse an existing row slot
                 mysql_id = spare_ids.pop(0)
-                matched_mysql_ids.add(mysql_id)
-                set_clause = ", ".join([f"`{c}` = %s" for c in sanitized_cols])
-                cur.execute(
-                    f"UPDATE `{table_name}` SET {set_clause}, `is_deleted` = 0 WHERE id = %s",
-                    row_data + [mysql_id],
-                )
+                slot_reuse_batch.append([mysql_id] + row_data)
             else:
-                # No spare slot — insert a brand-new row
-                cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{table_name}`")
-                next_id = cur.fetchone()[0] + 1
-                columns = "id, " + ", ".join([f"`{c}`" for c in sanitized_cols])
-                placeholders = ", ".join(["%s"] * (len(sanitized_cols) + 1))
-                cur.execute(
-                    f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})",
-                    [next_id] + row_data,
-                )
-                matched_mysql_ids.add(next_id)
+                # No spare slot — queue a brand-new row
+                next_id += 1
+                insert_batch.append([next_id] + row_data)
 
         # Soft-delete rows that exist in MySQL but are gone from MongoDB
-        if spare_ids:
+        soft_delete_ids.extend(spare_ids)
+
+    if undelete_batch:
+        if "updated_at" in sanitized_cols:
+            cur.executemany(
+                f"UPDATE `{table_name}` SET `is_deleted` = 0, `updated_at` = %s WHERE id = %s",
+                undelete_batch,
+            )
+        else:
+            cur.executemany(
+                f"UPDATE `{table_name}` SET `is_deleted` = 0 WHERE id = %s",
+                undelete_batch,
+            )
+
+    if slot_reuse_batch:
+        # executemany cannot batch UPDATEs (one round-trip per row), so stage
+        # the new row contents in a temporary table via one multi-VALUES
+        # INSERT and apply them with a single server-side UPDATE ... JOIN.
+        columns = "id, " + ", ".join([f"`{c}`" for c in sanitized_cols])
+        placeholders = ", ".join(["%s"] * (len(sanitized_cols) + 1))
+        set_clause = ", ".join(
+            [f"`{table_name}`.`{c}` = `tmp_slot_updates`.`{c}`" for c in sanitized_cols]
+        )
+        cur.execute(f"CREATE TEMPORARY TABLE `tmp_slot_updates` LIKE `{table_name}`")
+        try:
+            cur.executemany(
+                f"INSERT INTO `tmp_slot_updates` ({columns}) VALUES ({placeholders})",
+                slot_reuse_batch,
+            )
             cur.execute(
-                f"UPDATE `{table_name}` SET `is_deleted` = 1 "
-                f"WHERE id IN ({','.join(['%s'] * len(spare_ids))})",
-                spare_ids,
+                f"UPDATE `{table_name}` JOIN `tmp_slot_updates` USING (id) "
+                f"SET {set_clause}, `{table_name}`.`is_deleted` = 0"
             )
+        finally:
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS `tmp_slot_updates`")
+
+    if insert_batch:
+        columns = "id, " + ", ".join([f"`{c}`" for c in sanitized_cols])
+        placeholders = ", ".join(["%s"] * (len(sanitized_cols) + 1))
+        # pymysql rewrites this executemany into one multi-VALUES INSERT.
+        cur.executemany(
+            f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})",
+            insert_batch,
+        )
+
+    # Chunked so the IN list never outgrows the wire-protocol packet limit or
+    # degenerates into a pathological optimizer plan.
+    for i in range(0, len(soft_delete_ids), SELECT_CHUNK_SIZE):
+        chunk = soft_delete_ids[i:i + SELECT_CHUNK_SIZE]
+        cur.execute(
+            f"UPDATE `{table_name}` SET `is_deleted` = 1 "
+            f"WHERE id IN ({','.join(['%s'] * len(chunk))})",
+            chunk,
+        )
+
+
+def _tsv_field(value):
+    """
+    Render one value the way LOAD DATA expects with ESCAPED BY '\\\\':
+    None becomes an unescaped \\N (NULL), bools become 1/0, and backslash /
+    tab / newline characters in strings are backslash-escaped. Writing the
+    file through a CSV writer instead would escape the NULL marker itself,
+    which MySQL reads back as the literal text "\\N".
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
 
 def _insert_bulk(cur, table_name, df, sanitized_cols):
-    """Simple bulk INSERT for collections that have no _id field."""
+    """
+    Bulk load for collections that have no _id field.
+
+    Stages the rows as a TSV file and streams it with LOAD DATA LOCAL INFILE,
+    which skips per-row SQL parsing entirely. Falls back to a batched
+    executemany INSERT when the server refuses local infile.
+    """
     cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{table_name}`")
     next_id = cur.fetchone()[0] + 1
-    columns = "id, " + ", ".join([f"`{c}`" for c in sanitized_cols])
+    columns = "`id`, " + ", ".join([f"`{c}`" for c in sanitized_cols])
+
+    tmp = tempfile.NamedTemporaryFile(
+        mode="w", suffix=".tsv", newline="", encoding="utf-8", delete=False
+    )
+    try:
+        for i, row in enumerate(df.itertuples(index=False, name=None)):
+            fields = [str(next_id + i)]
+            fields.extend(_tsv_field(v) for v in row)
+            tmp.write("\t".join(fields) + "\n")
+        tmp.close()
+        try:
+            cur.execute(
+                f"LOAD DATA LOCAL INFILE '{tmp.name}' INTO TABLE `{table_name}` "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({columns})"
+            )
+            return
+        except pymysql.err.OperationalError:
+            # local_infile disabled on the server — fall back to batched INSERTs
+            pass
+    finally:
+        tmp.close()
+        os.unlink(tmp.name)
+
     placeholders = ", ".join(["%s"] * (len(sanitized_cols) + 1))
-    data = [[next_id + i] + row for i, row in enumerate(df.values.tolist())]
+    # itertuples yields plain tuples and the generator feeds executemany
+    # lazily — no rows×cols materialization via df.values.tolist().
+    data = (
+        (next_id + i, *row)
+        for i, row in enumerate(df.itertuples(index=False, name=None))
+    )
     cur.executemany(
         f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})",
         data,
@@ -224,56 +517,130 @@ def load_dataframe(table_name, df, mysql_config):
 
     df, sanitized_cols, column_types = _prepare_df(df)
 
-    conn = pymysql.connect(**mysql_config)
+    conn = pymysql.connect(**mysql_config, local_infile=True)
     cur = conn.cursor()
 
-    cur.execute(f"SHOW TABLES LIKE '{table_name}'")
-    table_exists = cur.fetchone()
+    # Run the whole load as one transaction with per-statement integrity
+    # checks relaxed — one commit/fsync instead of one per statement.
+    cur.execute("SET autocommit = 0")
+    cur.execute("SET unique_checks = 0")
+    cur.execute("SET foreign_key_checks = 0")
 
-    if not table_exists:
-        _ensure_table(cur, table_name, sanitized_cols, column_types)
-    else:
-        _evolve_schema(cur, table_name, sanitized_cols, column_types)
+    try:
+        known_types = _SCHEMA_CACHE.get(table_name)
+        if known_types is not None and all(
+            c in known_types and _widened_type(known_types[c], column_types[c]) is None
+            for c in sanitized_cols
+        ):
+            # All incoming columns exist with wide-enough types — skip the
+            # SHOW TABLES / DESCRIBE round-trips entirely.
+            pass
+        else:
+            cur.execute(f"SHOW TABLES LIKE '{table_name}'")
+            table_exists = cur.fetchone()
+
+            if not table_exists:
+                _ensure_table(cur, table_name, sanitized_cols, column_types)
+            else:
+                _evolve_schema(cur, table_name, sanitized_cols, column_types)
+
+        # For a large load into an empty table, drop the `_id` secondary index
+        # up front and rebuild it afterwards — one sort-based index build
+        # instead of per-row index maintenance. Only done when the table holds
+        # no rows yet, so incremental loads keep their index.
+        rebuild_id_index = False
+        if "_id" in sanitized_cols and len(df) >= BULK_INDEX_THRESHOLD:
+            cur.execute(f"SELECT 1 FROM `{table_name}` LIMIT 1")
+            if cur.fetchone() is None:
+                try:
+                    cur.execute(f"ALTER TABLE `{table_name}` DROP INDEX `idx_id`")
+                    rebuild_id_index = True
+                except Exception:
+                    pass
+
+        try:
+            if "_id" in sanitized_cols:
+                _upsert_by_id(cur, table_name, df, sanitized_cols, column_types)
+            else:
+                _insert_bulk(cur, table_name, df, sanitized_cols)
+        finally:
+            # DROP INDEX was DDL and survives a rollback, so recreate even on
+            # the failure path; if the connection itself died, _evolve_schema
+            # restores the index on the next load.
+            if rebuild_id_index:
+                try:
+                    cur.execute(f"CREATE INDEX `idx_id` ON `{table_name}` (`_id`)")
+                except Exception:
+                    pass
+
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            # Connection-level failure — nothing left to roll back; let the
+            # original exception propagate.
+            pass
+        raise
+    finally:
+        try:
+            cur.execute("SET unique_checks = 1")
+            cur.execute("SET foreign_key_checks = 1")
+            cur.close()
+        except Exception:
+            # Dead connection: restoring session state would only mask the
+            # real error, and close() below discards the session anyway.
+            pass
+        conn.close()
 
-    if "_id" in sanitized_cols:
-        _upsert_by_id(cur, table_name, df, sanitized_cols)
-    else:
-        _insert_bulk(cur, table_name, df, sanitized_cols)
+    print(f"  Done. ({len(df)} records)")
 
-    conn.commit()
-    cur.close()
-    conn.close()
 
-    print(f"  Done. ({len(df)} records)")
+ID_INSERT_CHUNK_SIZE = 10000
 
 
 def mark_deleted_documents(table_name, mongo_ids, mysql_config):
-    mongo_id_set = {str(mid) for mid in mongo_ids}
+    """
+    Soft-delete rows whose _id no longer exists in MongoDB.
+
+    Loads the live Mongo ids into an indexed temporary table and lets MySQL
+    compute the set difference server-side — no full `_id` scan into Python
+    and no multi-thousand-placeholder IN clause.
+    """
+    # mongo_ids may already be a set of string ids (streamed from the cursor);
+    # normalize only if the caller passed raw ObjectIds.
+    mongo_id_set = mongo_ids if isinstance(mongo_ids, set) else {str(mid) for mid in mongo_ids}
 
     conn = pymysql.connect(**mysql_config)
     cur = conn.cursor()
 
     try:
-        cur.execute(f"SELECT `_id` FROM `{table_name}` WHERE `is_deleted` = 0")
-        mysql_id_set = {str(row[0]) for row in cur.fetchall()}
-
-        mongo_count = len(mongo_id_set)
-        mysql_count = len(mysql_id_set)
-        print(f"  [{table_name}] Mongo: {mongo_count} | MySQL: {mysql_count}")
-
-        if mongo_count != mysql_count:
-            deleted_ids = mysql_id_set - mongo_id_set
-            if deleted_ids:
-                placeholders = ", ".join(["%s"] * len(deleted_ids))
-                cur.execute(
-                    f"UPDATE `{table_name}` SET `is_deleted` = 1 "
-                    f"WHERE `_id` IN ({placeholders}) AND `is_deleted` = 0",
-                    list(deleted_ids),
-                )
-                conn.commit()
-                print(f"  {len(deleted_ids)} marked deleted: {deleted_ids}")
-            else:
-                print(f"  Count mismatch — no specific IDs found.")
+        # InnoDB, not ENGINE=MEMORY: the MEMORY engine stores VARCHAR
+        # fixed-width and hits max_heap_table_size (default 16 MB, ~60k ids)
+        # with "table is full" on exactly the large collections this path is
+        # for; an InnoDB temp table spills to disk and keeps the PK index.
+        cur.execute(
+            "CREATE TEMPORARY TABLE `tmp_mongo_ids` (`_id` VARCHAR(255) PRIMARY KEY)"
+        )
+        mongo_id_list = list(mongo_id_set)
+        for i in range(0, len(mongo_id_list), ID_INSERT_CHUNK_SIZE):
+            cur.executemany(
+                "INSERT INTO `tmp_mongo_ids` (`_id`) VALUES (%s)",
+                mongo_id_list[i:i + ID_INSERT_CHUNK_SIZE],
+            )
+
+        cur.execute(
+            f"UPDATE `{table_name}` SET `is_deleted` = 1 "
+            f"WHERE `is_deleted` = 0 "
+            f"AND `_id` NOT IN (SELECT `_id` FROM `tmp_mongo_ids`)"
+        )
+        deleted_count = cur.rowcount
+        conn.commit()
+
+        print(f"  [{table_name}] Mongo: {len(mongo_id_set)} | marked deleted: {deleted_count}")
     finally:
+        # No explicit temp-table cleanup: closing the connection drops
+        # session temporary tables, and running SQL here after a
+        # connection-level failure would mask the original error.
         cur.close()
         conn.close()
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from bson import ObjectId
 
@@ -7,12 +8,30 @@ def convert_objectid(value):
     return value
 
 def infer_mysql_type(series):
-    series = series.dropna()
+    # Dtype fast paths — no per-element Python dispatch.
+    if pd.api.types.is_bool_dtype(series):
+        return "TINYINT(1)"
+
+    if pd.api.types.is_integer_dtype(series):
+        return "BIGINT"
 
-    if len(series) == 0:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "DATETIME"
+
+    if pd.api.types.is_float_dtype(series):
+        arr = series.dropna().to_numpy()
+        if len(arr) == 0:
+            return "TEXT"
+        if np.all(np.mod(arr, 1) == 0):
+            return "BIGINT"
+        return "DECIMAL(20,6)"
+
+    # Object dtype: sample the first non-null value without copying the column.
+    first_idx = series.first_valid_index()
+    if first_idx is None:
         return "TEXT"
 
-    sample = series.iloc[0]
+    sample = series.loc[first_idx]
 
     if isinstance(sample, bool):
         return "TINYINT(1)"
@@ -21,15 +40,17 @@ def infer_mysql_type(series):
         return "BIGINT"
 
     if isinstance(sample, float):
-        if series.apply(lambda x: isinstance(x, float) and x.is_integer()).all():
+        numeric = pd.to_numeric(series.dropna(), errors="coerce")
+        if numeric.notna().all() and ((numeric % 1) == 0).all():
             return "BIGINT"
         return "DECIMAL(20,6)"
 
-    if pd.api.types.is_datetime64_any_dtype(series):
-        return "DATETIME"
-
     if isinstance(sample, str):
-        max_len = series.astype(str).str.len().max()
+        non_null = series.dropna()
+        try:
+            max_len = int(non_null.map(len).max())
+        except TypeError:
+            max_len = int(non_null.astype(str).str.len().max())
         if max_len <= 255:
             return f"VARCHAR({min(max_len + 50, 255)})"
         else:
@@ -38,10 +59,19 @@ def infer_mysql_type(series):
     return "TEXT"
 
 def prepare_dataframe_for_mysql(df):
-    df = df.copy()
+    # Upcast to object so NaN becomes a real None and numpy scalars become
+    # plain Python values that pymysql can escape. astype already yields a
+    # new frame under copy-on-write, so no defensive copy is needed and the
+    # caller's frame stays untouched.
+    df = df.astype(object)
+    # Only columns actually holding ObjectIds need conversion — detect via the
+    # first non-null value instead of dispatching convert_objectid per cell
+    # across the whole frame.
     for col in df.columns:
-        df[col] = df[col].apply(convert_objectid)
-    df = df.astype(object).where(pd.notnull(df), None)
+        first_idx = df[col].first_valid_index()
+        if first_idx is not None and isinstance(df[col].loc[first_idx], ObjectId):
+            df[col] = df[col].map(convert_objectid)
+    df = df.where(df.notna(), None)
     return df
 
 def get_column_types(df):